@@ -1,36 +1,120 @@
 """Run the application."""
 
-from datetime import datetime
+import time
 
-from definition import Project, Task, TaskOrganizer, validate_date
+# Taken before the other imports so the startup profile includes them.
+IMPORT_START = time.perf_counter()
 
+import argparse  # noqa: E402
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple  # noqa: E402
 
-def main() -> None:
+from definition import (  # noqa: E402
+    Project,
+    Task,
+    TaskOrganizer,
+    validate_date,
+)
+
+if TYPE_CHECKING:
+    from reminders import ReminderScheduler
+
+DASHBOARD_PROJECTS = 10
+
+
+class StartupTimer:
+    """Record how long each startup step takes."""
+
+    def __init__(self, start: Optional[float] = None) -> None:
+        """Initialize StartupTimer object."""
+        if start is None:
+            start = time.perf_counter()
+        self.start = self.last = start
+        self.steps: List[Tuple[str, float]] = []
+
+    def mark(self, step: str) -> None:
+        """Record the time since the previous step."""
+        now = time.perf_counter()
+        self.steps.append((step, now - self.last))
+        self.last = now
+
+    def print_breakdown(self) -> None:
+        """Print the time taken by each step and in total."""
+        print("\nStartup profile:")
+        for step, seconds in self.steps:
+            print(f"{step}: {seconds * 1000:.1f} ms")
+        print(f"Total: {(self.last - self.start) * 1000:.1f} ms")
+
+
+def print_report(organizer: TaskOrganizer) -> None:
+    """Print the analytics report."""
+    try:
+        from analytics import Analytics, format_report
+    except ImportError:
+        print("The report requires NumPy: pip install numpy")
+        return
+
+    print(format_report(Analytics(organizer.conn)))
+
+
+def print_reminder(event: str, task: Tuple[Any, ...]) -> None:
+    """Print a due-soon or overdue reminder."""
+    from reminders import DUE_SOON
+
+    task_id, description, due_date = task[:3]
+    state = "is due soon" if event == DUE_SOON else "is overdue"
+    print(f"Reminder: Task '{task_id}' ({description}) {state}: {due_date}")
+
+
+def print_projects(
+    organizer: TaskOrganizer, limit: Optional[int] = None
+) -> None:
+    """Print projects with their task counts."""
+    summaries = organizer.project_summaries(
+        None if limit is None else limit + 1
+    )
+    for project_id, project_name, task_counts in summaries[:limit]:
+        print(f"Project ID: {project_id}, Name: {project_name}")
+        print(
+            f"Completed: {task_counts['completed']}, "
+            f"Pending: {task_counts['pending']}, "
+            f"Overdue: {task_counts['overdue']}"
+        )
+    if limit is not None and len(summaries) > limit:
+        print("More projects not shown. Choose 10 to list all projects.")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Run the program."""
+    timer = StartupTimer(IMPORT_START)
+    timer.mark("Imports")
+    parser = argparse.ArgumentParser(description="Task and Project Organizer")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["report"],
+        help="print the analytics report and exit",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print how long each step takes before the first prompt",
+    )
+    args = parser.parse_args(argv)
+    timer.mark("Parse arguments")
     organizer = TaskOrganizer("task_organizer.db")
-    organizer.handle_recurring_tasks()
-    cursor = organizer.conn.cursor()
-    cursor.execute("SELECT due_date, status FROM tasks")
-    tasks = cursor.fetchall()
-    if tasks:
-        for due_date, status in tasks:
-            due_date_obj = datetime.strptime(due_date, "%m/%d/%Y")
-            current_date = datetime.now().date()
-            if status != "completed" and due_date_obj.date() < current_date:
-                status = "overdue"
+    timer.mark("Open database")
+    if args.command == "report":
+        print_report(organizer)
+        organizer.close()
+        return
+    reminders: Optional["ReminderScheduler"] = None
 
     while True:
+        if reminders is not None:
+            reminders.run_pending()
         print("\nTask and Project Organizer")
         print("Current Projects:")
-        projects = organizer.list_projects()
-        for project_id, project_name in projects:
-            task_counts = organizer.get_task_counts(project_id)
-            print(f"Project ID: {project_id}, Name: {project_name}")
-            print(
-                f"Completed: {task_counts['completed']}, "
-                f"Pending: {task_counts['pending']}, "
-                f"Overdue: {task_counts['overdue']}"
-            )
+        print_projects(organizer, DASHBOARD_PROJECTS)
 
         print("\nMenu:")
         print("1. Add Project")
@@ -41,8 +125,15 @@ def main() -> None:
         print("6. Delete")
         print("7. Search Tasks or Projects")
         print("8. View History")
+        print("9. View Report")
+        print("10. List All Projects")
         print("0. Exit")
 
+        if reminders is None:
+            timer.mark("Render dashboard")
+            if args.profile_startup:
+                timer.print_breakdown()
+
         choice = input("Enter your choice: ")
 
         if choice == "1":
@@ -247,12 +338,24 @@ def main() -> None:
                     )
             else:
                 print("No history records found.")
+        elif choice == "9":
+            print_report(organizer)
+        elif choice == "10":
+            print_projects(organizer)
         elif choice == "0":
             print("Exiting...")
+            organizer.close()
             break
         else:
             print("Invalid choice. Please try again.")
 
+        if reminders is None:
+            # Deferred until the first command is done to keep startup fast.
+            from reminders import ReminderScheduler
+
+            organizer.handle_recurring_tasks()
+            reminders = ReminderScheduler(organizer, print_reminder)
+
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,34 @@
 """Define classes and functions."""
 
 import sqlite3
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Bump whenever create_tables changes so existing databases are upgraded.
+SCHEMA_VERSION = 1
+
+# Sortable YYYY-MM-DD form of the MM/DD/YYYY due date, which also accepts
+# dates without zero padding. Queries must use the same expression to be
+# served by the index on it.
+_DUE_DATE_REST = "substr(due_date, instr(due_date, '/') + 1)"
+DUE_DATE_KEY = (
+    "printf('%s-%02d-%02d', "
+    f"substr({_DUE_DATE_REST}, instr({_DUE_DATE_REST}, '/') + 1), "
+    "substr(due_date, 1, instr(due_date, '/') - 1), "
+    f"substr({_DUE_DATE_REST}, 1, instr({_DUE_DATE_REST}, '/') - 1))"
+)
+
+# Task counts per project; each count is a range scan of the
+# (project_id, status) index.
+PROJECT_SUMMARIES_QUERY = """SELECT id, name,
+    (SELECT COUNT(*) FROM tasks
+    WHERE project_id = p.id AND status = 'completed'),
+    (SELECT COUNT(*) FROM tasks
+    WHERE project_id = p.id AND status = 'pending'),
+    (SELECT COUNT(*) FROM tasks
+    WHERE project_id = p.id AND status = 'overdue')
+    FROM projects p"""
 
 
 class Task:
@@ -40,12 +66,24 @@ class TaskOrganizer:
 
     def __init__(self, db_name: str) -> None:
         """Initialize TaskOrganizer object."""
-        self.conn = sqlite3.connect(db_name)
+        self.listeners: List[Callable[[str, str, str], None]] = []
+        self.conn = self._connect(db_name)
         self.create_tables()
 
+    def _connect(self, db_name: str) -> sqlite3.Connection:
+        """Open the connection used by the organizer."""
+        return sqlite3.connect(db_name)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.conn.close()
+
     def create_tables(self) -> None:
-        """Create tables in the database."""
+        """Create tables in the database unless they are up to date."""
         cursor = self.conn.cursor()
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] == SCHEMA_VERSION:
+            return
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS projects (
                 id TEXT PRIMARY KEY,
@@ -74,6 +112,33 @@ class TaskOrganizer:
                 timestamp TEXT DEFAULT (datetime('now'))
             )
         """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS task_dependencies (
+                task_id TEXT,
+                depends_on_id TEXT,
+                satisfied INTEGER DEFAULT 0,
+                PRIMARY KEY (task_id, depends_on_id),
+                FOREIGN KEY (task_id) REFERENCES tasks (id),
+                FOREIGN KEY (depends_on_id) REFERENCES tasks (id)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_task_dependencies_depends_on
+            ON task_dependencies (depends_on_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_task_dependencies_unsatisfied
+            ON task_dependencies (task_id) WHERE satisfied = 0
+        """)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_tasks_due_date
+            ON tasks ({DUE_DATE_KEY})
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_project_status
+            ON tasks (project_id, status)
+        """)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
         self.conn.commit()
 
@@ -124,18 +189,37 @@ class TaskOrganizer:
         )
 
     def log_history(
-        self, entity_type: str, entity_id: str, action: str, details: str
+        self,
+        entity_type: str,
+        entity_id: str,
+        action: str,
+        details: str,
+        commit: bool = True,
     ) -> None:
-        """Log history in the database."""
+        """Log history in the database.
+
+        Callers writing many rows pass ``commit=False`` and commit once.
+        """
         cursor = self.conn.cursor()
         cursor.execute(
             """
-            INSERT INTO history (entity_type, entity_id, action, details) 
-            VALUES (?, ?, ?, ?)
+            INSERT INTO history (
+                entity_type, entity_id, action, details, timestamp
+            )
+            VALUES (?, ?, ?, ?, ?)
             """,
-            (entity_type, entity_id, action, details),
+            (
+                entity_type,
+                entity_id,
+                action,
+                details,
+                datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            ),
         )
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
+        for listener in self.listeners:
+            listener(entity_type, entity_id, action)
 
     def fetch_history(self) -> List[Any]:
         """Fetch and return all history logs."""
@@ -156,6 +240,17 @@ class TaskOrganizer:
         )
         return cursor.fetchall()
 
+    def list_tasks_due_between(self, start: date, end: date) -> List[Any]:
+        """List unfinished tasks due on or after start and before end."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"""SELECT * FROM tasks
+            WHERE {DUE_DATE_KEY} >= ? AND {DUE_DATE_KEY} < ?
+            AND status != 'completed'""",
+            (start.isoformat(), end.isoformat()),
+        )
+        return cursor.fetchall()
+
     def search_projects(self, keyword: str) -> Any:
         """Search projects in the database."""
         cursor = self.conn.cursor()
@@ -167,7 +262,10 @@ class TaskOrganizer:
     def handle_recurring_tasks(self) -> None:
         """Handle recurring tasks."""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE recurrence != 'none'")
+        # Tasks whose next occurrence exists were handled by an earlier run.
+        cursor.execute("""SELECT * FROM tasks t
+            WHERE recurrence != 'none' AND status = 'completed'
+            AND NOT EXISTS (SELECT 1 FROM tasks WHERE id = t.id || '_next')""")
         recurring_tasks = cursor.fetchall()
         for task in recurring_tasks:
             (
@@ -209,6 +307,7 @@ class TaskOrganizer:
                 new_task_id,
                 "Recur",
                 f"New task {new_task_id} created based on recurrence settings",
+                commit=False,
             )
         self.conn.commit()
 
@@ -263,6 +362,7 @@ class TaskOrganizer:
                     task_id,
                 ),
             )
+            self._set_dependents_satisfied(task_id, status == "completed")
             self.conn.commit()
             self.log_history("Task", task_id, "Edit", f"Task {task_id} edited")
             return True
@@ -294,18 +394,47 @@ class TaskOrganizer:
             "WHERE project_id = ? AND id = ?",
             (project_id, task_id),
         )
+        if cursor.rowcount:
+            self._set_dependents_satisfied(task_id, True)
         self.conn.commit()
         self.log_history(
             "Task", task_id, "Complete", f"Task {task_id} marked as completed"
         )
 
-    def list_projects(self) -> List[Tuple[str, str]]:
-        """List all projects."""
+    def list_projects(
+        self, limit: Optional[int] = None
+    ) -> List[Tuple[str, str]]:
+        """List all projects, or the first ones if a limit is given."""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM projects")
+        if limit is None:
+            cursor.execute("SELECT * FROM projects")
+        else:
+            cursor.execute("SELECT * FROM projects LIMIT ?", (limit,))
         projects = cursor.fetchall()
         return projects
 
+    def project_summaries(
+        self, limit: Optional[int] = None
+    ) -> List[Tuple[str, str, Dict[str, int]]]:
+        """Get task counts for all projects, or the first ones."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            PROJECT_SUMMARIES_QUERY + " LIMIT ?",
+            (-1 if limit is None else limit,),
+        )
+        return [
+            (
+                project_id,
+                name,
+                {
+                    "completed": completed,
+                    "pending": pending,
+                    "overdue": overdue,
+                },
+            )
+            for project_id, name, completed, pending, overdue in cursor
+        ]
+
     def get_task_counts(self, project_id: str) -> Dict[str, int]:
         """Get task counts for a project."""
         cursor = self.conn.cursor()
@@ -323,6 +452,12 @@ class TaskOrganizer:
     def delete_project(self, project_id: str) -> None:
         """Delete project and its tasks."""
         cursor = self.conn.cursor()
+        cursor.execute(
+            """DELETE FROM task_dependencies
+            WHERE task_id IN (SELECT id FROM tasks WHERE project_id = ?)
+            OR depends_on_id IN (SELECT id FROM tasks WHERE project_id = ?)""",
+            (project_id, project_id),
+        )
         cursor.execute("DELETE FROM tasks WHERE project_id = ?", (project_id,))
         cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
         self.conn.commit()
@@ -337,9 +472,188 @@ class TaskOrganizer:
             "DELETE FROM tasks WHERE project_id = ? AND id = ?",
             (project_id, task_id),
         )
+        if cursor.rowcount:
+            cursor.execute(
+                "DELETE FROM task_dependencies "
+                "WHERE task_id = ? OR depends_on_id = ?",
+                (task_id, task_id),
+            )
         self.conn.commit()
         self.log_history("Task", task_id, "Delete", f"Task {task_id} deleted")
 
+    def _set_dependents_satisfied(self, task_id: str, satisfied: bool) -> None:
+        """Update the dependencies on a task after its status changed."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "UPDATE task_dependencies SET satisfied = ? "
+            "WHERE depends_on_id = ?",
+            (int(satisfied), task_id),
+        )
+
+    def add_dependency(self, task_id: str, depends_on_id: str) -> bool:
+        """Make a task depend on another task.
+
+        Returns False if either task does not exist or the dependency
+        would create a cycle.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT id, status FROM tasks WHERE id IN (?, ?)",
+            (task_id, depends_on_id),
+        )
+        statuses = dict(cursor.fetchall())
+        if task_id not in statuses or depends_on_id not in statuses:
+            return False
+        cursor.execute(
+            """WITH RECURSIVE reachable(id) AS (
+                SELECT ?
+                UNION
+                SELECT d.depends_on_id
+                FROM task_dependencies d
+                JOIN reachable r ON d.task_id = r.id
+            )
+            SELECT 1 FROM reachable WHERE id = ? LIMIT 1""",
+            (depends_on_id, task_id),
+        )
+        if cursor.fetchone():
+            return False
+        cursor.execute(
+            """INSERT OR IGNORE INTO task_dependencies (
+                task_id,
+                depends_on_id,
+                satisfied
+            )
+            VALUES (?, ?, ?)""",
+            (
+                task_id,
+                depends_on_id,
+                int(statuses[depends_on_id] == "completed"),
+            ),
+        )
+        self.conn.commit()
+        self.log_history(
+            "Task",
+            task_id,
+            "Add Dependency",
+            f"Task {task_id} depends on task {depends_on_id}",
+        )
+        return True
+
+    def remove_dependency(self, task_id: str, depends_on_id: str) -> None:
+        """Remove the dependency of a task on another task."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "DELETE FROM task_dependencies "
+            "WHERE task_id = ? AND depends_on_id = ?",
+            (task_id, depends_on_id),
+        )
+        self.conn.commit()
+        self.log_history(
+            "Task",
+            task_id,
+            "Remove Dependency",
+            f"Task {task_id} no longer depends on task {depends_on_id}",
+        )
+
+    def is_blocked(self, task_id: str) -> bool:
+        """Check whether a task has unfinished dependencies."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT 1 FROM task_dependencies "
+            "WHERE task_id = ? AND satisfied = 0 LIMIT 1",
+            (task_id,),
+        )
+        return cursor.fetchone() is not None
+
+    def list_blocked_tasks(self) -> List[Any]:
+        """List unfinished tasks that have unfinished dependencies."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """SELECT * FROM tasks
+            WHERE status != 'completed'
+            AND id IN (
+                SELECT task_id FROM task_dependencies WHERE satisfied = 0
+            )"""
+        )
+        return cursor.fetchall()
+
+    def list_ready_tasks(self) -> List[Any]:
+        """List unfinished tasks whose dependencies are all completed."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """SELECT * FROM tasks
+            WHERE status != 'completed'
+            AND id NOT IN (
+                SELECT task_id FROM task_dependencies WHERE satisfied = 0
+            )"""
+        )
+        return cursor.fetchall()
+
+    def _dependency_graph(
+        self, pending_only: bool = False
+    ) -> Tuple[List[str], Dict[str, List[str]], Dict[str, int]]:
+        """Return tasks, dependents and in-degrees of the dependency graph.
+
+        Edges point from a task to the tasks that depend on it.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id, status FROM tasks ORDER BY id")
+        task_ids = [
+            task_id
+            for task_id, status in cursor.fetchall()
+            if not pending_only or status != "completed"
+        ]
+        cursor.execute("SELECT depends_on_id, task_id FROM task_dependencies")
+        dependents: Dict[str, List[str]] = {
+            task_id: [] for task_id in task_ids
+        }
+        in_degree = dict.fromkeys(task_ids, 0)
+        for depends_on_id, task_id in cursor.fetchall():
+            if depends_on_id in dependents and task_id in in_degree:
+                dependents[depends_on_id].append(task_id)
+                in_degree[task_id] += 1
+        return task_ids, dependents, in_degree
+
+    def topological_order(self) -> List[str]:
+        """List task IDs so that every task comes after its dependencies."""
+        task_ids, dependents, in_degree = self._dependency_graph()
+        queue = deque(t for t in task_ids if in_degree[t] == 0)
+        order = []
+        while queue:
+            task_id = queue.popleft()
+            order.append(task_id)
+            for dependent in dependents[task_id]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    queue.append(dependent)
+        return order
+
+    def critical_path(self) -> List[str]:
+        """Return the longest chain of unfinished dependent tasks."""
+        task_ids, dependents, in_degree = self._dependency_graph(
+            pending_only=True
+        )
+        queue = deque(t for t in task_ids if in_degree[t] == 0)
+        length = dict.fromkeys(task_ids, 1)
+        previous: Dict[str, Optional[str]] = dict.fromkeys(task_ids)
+        last: Optional[str] = None
+        while queue:
+            task_id = queue.popleft()
+            if last is None or length[task_id] > length[last]:
+                last = task_id
+            for dependent in dependents[task_id]:
+                if length[task_id] + 1 > length[dependent]:
+                    length[dependent] = length[task_id] + 1
+                    previous[dependent] = task_id
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    queue.append(dependent)
+        path = []
+        while last is not None:
+            path.append(last)
+            last = previous[last]
+        return path[::-1]
+
 
 def validate_date(date_string: str) -> bool:
     """Validate date format."""
@@ -0,0 +1,179 @@
+"""Query many organizer databases in parallel."""
+
+import glob
+import heapq
+import itertools
+import pathlib
+import sqlite3
+import threading
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from definition import PROJECT_SUMMARIES_QUERY
+
+_local = threading.local()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Return this worker's read-only connection to a database."""
+    connections: Dict[str, sqlite3.Connection] = getattr(
+        _local, "connections", {}
+    )
+    _local.connections = connections
+    if path not in connections:
+        uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+        connections[path] = sqlite3.connect(uri, uri=True)
+    return connections[path]
+
+
+def _run_query(
+    path: str, query: str, params: Tuple[Any, ...]
+) -> Tuple[str, List[Any], float]:
+    """Run a query against one database and time it."""
+    start = time.perf_counter()
+    cursor = _connect(path).cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    return path, rows, time.perf_counter() - start
+
+
+class FederatedOrganizer:
+    """Read-only view over many organizer databases.
+
+    Every query runs on all shards at once in a thread or process pool.
+    Each shard returns at most ``limit`` rows, already sorted, and the
+    shard results are merged lazily so only the rows that are kept get
+    compared and tagged.
+    Rows are prefixed with the path of the shard they came from, and the
+    time spent on each shard by the last query is kept in ``timings``.
+    """
+
+    def __init__(
+        self,
+        databases: Union[str, Iterable[str]],
+        use_processes: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        """Initialize FederatedOrganizer object."""
+        if isinstance(databases, str):
+            self.databases = sorted(glob.glob(databases))
+        else:
+            self.databases = list(databases)
+        self.executor: Executor
+        if use_processes:
+            self.executor = ProcessPoolExecutor(max_workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers)
+        self.timings: Dict[str, float] = {}
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        self.executor.shutdown()
+
+    def _fan_out(
+        self, query: str, params: Tuple[Any, ...] = ()
+    ) -> List[Iterator[Tuple[Any, ...]]]:
+        """Run a query on every shard and stream its rows as they arrive."""
+        self.timings = {}
+
+        def shard_rows(future: "Future[Any]") -> Iterator[Tuple[Any, ...]]:
+            path, rows, elapsed = future.result()
+            self.timings[path] = elapsed
+            for row in rows:
+                yield (path, *row)
+
+        return [
+            shard_rows(self.executor.submit(_run_query, path, query, params))
+            for path in self.databases
+        ]
+
+    def _merge(
+        self,
+        query: str,
+        params: Tuple[Any, ...],
+        key: Callable[[Tuple[Any, ...]], Any],
+        limit: Optional[int],
+        reverse: bool = False,
+    ) -> List[Tuple[Any, ...]]:
+        """Merge sorted shard results and keep the first rows."""
+        merged = heapq.merge(
+            *self._fan_out(query, params), key=key, reverse=reverse
+        )
+        return list(itertools.islice(merged, limit))
+
+    def search_tasks(
+        self, keyword: str, limit: Optional[int] = None
+    ) -> List[Tuple[Any, ...]]:
+        """Search tasks in every database, ordered by task ID."""
+        return self._merge(
+            "SELECT * FROM tasks WHERE description LIKE ? ORDER BY id LIMIT ?",
+            ("%" + keyword + "%", -1 if limit is None else limit),
+            key=lambda row: row[1],
+            limit=limit,
+        )
+
+    def list_projects(
+        self, limit: Optional[int] = None
+    ) -> List[Tuple[Any, ...]]:
+        """List projects in every database, ordered by project ID."""
+        return self._merge(
+            "SELECT * FROM projects ORDER BY id LIMIT ?",
+            (-1 if limit is None else limit,),
+            key=lambda row: row[1],
+            limit=limit,
+        )
+
+    def fetch_history(
+        self, limit: Optional[int] = None
+    ) -> List[Tuple[Any, ...]]:
+        """Fetch history logs from every database, newest first."""
+        return self._merge(
+            """SELECT entity_type, entity_id, action, details, timestamp
+            FROM history
+            ORDER BY timestamp DESC
+            LIMIT ?""",
+            (-1 if limit is None else limit,),
+            key=lambda row: row[5],
+            limit=limit,
+            reverse=True,
+        )
+
+    def project_summaries(
+        self, limit: Optional[int] = None
+    ) -> List[Tuple[str, str, str, Dict[str, int]]]:
+        """Get task counts for the projects in every database."""
+        rows = self._merge(
+            PROJECT_SUMMARIES_QUERY + " ORDER BY id LIMIT ?",
+            (-1 if limit is None else limit,),
+            key=lambda row: (row[1], row[0]),
+            limit=limit,
+        )
+        return [
+            (
+                path,
+                project_id,
+                name,
+                {
+                    "completed": completed,
+                    "pending": pending,
+                    "overdue": overdue,
+                },
+            )
+            for path, project_id, name, completed, pending, overdue in rows
+        ]
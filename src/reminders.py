@@ -0,0 +1,209 @@
+"""Notify when tasks are due soon or overdue."""
+
+import heapq
+import itertools
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from definition import TaskOrganizer
+
+DUE_SOON = "due_soon"
+OVERDUE = "overdue"
+TASK_FIELDS = (
+    "task_id",
+    "description",
+    "due_date",
+    "status",
+    "project_id",
+    "priority",
+    "recurrence",
+)
+
+Notifier = Callable[[str, Tuple[Any, ...]], None]
+
+
+def parse_due_date(due_date: str) -> datetime:
+    """Parse an MM/DD/YYYY due date faster than strptime."""
+    month, day, year = due_date.split("/")
+    return datetime(int(year), int(month), int(day))
+
+
+def webhook(url: str, timeout: float = 5.0) -> Notifier:
+    """Return a notifier that posts reminders as JSON to a URL."""
+
+    def notify(event: str, task: Tuple[Any, ...]) -> None:
+        import urllib.request
+
+        body = json.dumps(
+            {"event": event, "task": dict(zip(TASK_FIELDS, task, strict=True))}
+        ).encode()
+        request = urllib.request.Request(
+            url, data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=timeout):
+            pass
+
+    return notify
+
+
+class ReminderScheduler:
+    """Heap of upcoming due-soon and overdue reminders.
+
+    Only unfinished tasks due within the loaded window are kept in the
+    heap. The window is filled from the due date index and moves forward
+    as time passes, so no reminder needs a scan of the whole tasks table.
+    The time up to which reminders were sent is saved in the database, so
+    a new scheduler only sends the reminders that came due since then, and
+    at most those of the last ``catch_up``. Changes made through the
+    organizer reschedule the affected task: stale heap entries are skipped
+    when they come up instead of being removed.
+    """
+
+    def __init__(
+        self,
+        organizer: TaskOrganizer,
+        notify: Notifier,
+        lead_time: timedelta = timedelta(days=1),
+        horizon: timedelta = timedelta(days=7),
+        now: Optional[datetime] = None,
+        catch_up: timedelta = timedelta(days=7),
+    ) -> None:
+        """Initialize ReminderScheduler object."""
+        self.organizer = organizer
+        self.notify = notify
+        self.lead_time = lead_time
+        self.horizon = horizon
+        self.heap: List[Tuple[datetime, int, str, int, str]] = []
+        self.versions: Dict[str, int] = {}
+        self.tasks: Dict[str, Tuple[Any, ...]] = {}
+        self.counter = itertools.count()
+        if now is None:
+            now = datetime.now()
+        self.now = now
+        self.reminded_until = max(self._load_reminded_until(), now - catch_up)
+        # Tasks due before this date had all their reminders sent already.
+        self.loaded_until = (self.reminded_until - timedelta(days=1)).date()
+        self._extend_window(now)
+        organizer.listeners.append(self.task_changed)
+
+    def _load_reminded_until(self) -> datetime:
+        """Read the time up to which reminders were sent."""
+        conn = self.organizer.conn
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS reminder_state (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                reminded_until TEXT
+            )
+        """)
+        conn.commit()
+        row = conn.execute(
+            "SELECT reminded_until FROM reminder_state"
+        ).fetchone()
+        if row is None:
+            return datetime.min
+        return datetime.fromisoformat(row[0])
+
+    def _save_reminded_until(self) -> None:
+        """Save the time up to which reminders were sent."""
+        conn = self.organizer.conn
+        conn.execute(
+            "INSERT OR REPLACE INTO reminder_state (id, reminded_until) "
+            "VALUES (0, ?)",
+            (self.reminded_until.isoformat(),),
+        )
+        conn.commit()
+
+    def _extend_window(self, now: datetime) -> None:
+        """Load tasks due before the end of the look-ahead window."""
+        needed = (now + self.lead_time).date() + timedelta(days=1)
+        if needed <= self.loaded_until:
+            return
+        end = needed + self.horizon
+        for task in self.organizer.list_tasks_due_between(
+            self.loaded_until, end
+        ):
+            self._schedule(task, after=self.reminded_until)
+        self.loaded_until = end
+
+    def _schedule(
+        self, task: Tuple[Any, ...], after: Optional[datetime] = None
+    ) -> None:
+        """Push the reminders of a task, replacing earlier ones.
+
+        Reminders due at or before ``after`` are left out, and tasks whose
+        due date cannot be read are skipped.
+        """
+        try:
+            due = parse_due_date(task[2])
+        except (AttributeError, ValueError):
+            return
+        overdue_at = due + timedelta(days=1)
+        reminders = [(overdue_at, OVERDUE)]
+        if overdue_at > self.now:
+            reminders.append((due - self.lead_time, DUE_SOON))
+        if after is not None:
+            reminders = [r for r in reminders if r[0] > after]
+        if not reminders:
+            return
+        task_id = task[0]
+        version = next(self.counter)
+        self.versions[task_id] = version
+        self.tasks[task_id] = task
+        for fire_at, event in reminders:
+            heapq.heappush(
+                self.heap,
+                (fire_at, next(self.counter), task_id, version, event),
+            )
+
+    def task_changed(
+        self, entity_type: str, entity_id: str, action: str
+    ) -> None:
+        """Reschedule a task after it was added, edited or removed."""
+        if entity_type != "Task":
+            return
+        # Invalidate the heap entries of the task.
+        self.versions.pop(entity_id, None)
+        self.tasks.pop(entity_id, None)
+        cursor = self.organizer.conn.cursor()
+        cursor.execute("SELECT * FROM tasks WHERE id = ?", (entity_id,))
+        task = cursor.fetchone()
+        if task is None or task[3] == "completed":
+            return
+        try:
+            due = parse_due_date(task[2]).date()
+        except (AttributeError, ValueError):
+            return
+        if due < self.loaded_until:
+            self._schedule(task)
+
+    def next_fire_time(self) -> Optional[datetime]:
+        """Return when the next reminder is due."""
+        while self.heap:
+            _, _, task_id, version, _ = self.heap[0]
+            if self.versions.get(task_id) == version:
+                return self.heap[0][0]
+            heapq.heappop(self.heap)
+        return None
+
+    def run_pending(self, now: Optional[datetime] = None) -> int:
+        """Send the reminders that are due and return how many were sent."""
+        if now is None:
+            now = datetime.now()
+        self.now = now
+        self._extend_window(now)
+        sent = 0
+        while self.heap and self.heap[0][0] <= now:
+            _, _, task_id, version, event = heapq.heappop(self.heap)
+            if self.versions.get(task_id) != version:
+                continue
+            task = self.tasks[task_id]
+            if event == OVERDUE:
+                del self.versions[task_id]
+                del self.tasks[task_id]
+            self.notify(event, task)
+            sent += 1
+        if now > self.reminded_until:
+            self.reminded_until = now
+            self._save_reminded_until()
+        return sent
@@ -0,0 +1,329 @@
+"""Run the organizer in memory with snapshots to disk."""
+
+import atexit
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import IO, Any, Callable, Iterable, List, Optional, Tuple
+
+from definition import TaskOrganizer
+
+WRITE_STATEMENTS = (
+    "INSERT",
+    "UPDATE",
+    "DELETE",
+    "REPLACE",
+    "CREATE",
+    "DROP",
+    "ALTER",
+)
+
+
+class JournaledCursor(sqlite3.Cursor):
+    """Cursor that remembers the write statements it runs."""
+
+    def execute(self, sql: str, parameters: Any = (), /) -> "JournaledCursor":
+        """Run a statement and remember it if it is a write."""
+        super().execute(sql, parameters)
+        self.connection.record(sql, parameters)  # type: ignore[attr-defined]
+        return self
+
+    def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Any], /
+    ) -> "JournaledCursor":
+        """Run a statement for each set of parameters and remember them."""
+        parameters = list(seq_of_parameters)
+        super().executemany(sql, parameters)
+        for params in parameters:
+            self.connection.record(sql, params)  # type: ignore[attr-defined]
+        return self
+
+
+class JournaledConnection(sqlite3.Connection):
+    """Connection that keeps the writes of the open transaction.
+
+    Writes are collected in ``pending`` while ``recording`` is set, handed
+    to ``on_commit`` together with the real commit, and dropped on
+    rollback.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize JournaledConnection object."""
+        super().__init__(*args, **kwargs)
+        self.recording = False
+        self.pending: List[Tuple[str, Any]] = []
+        self.on_commit: Optional[Callable[[Callable[[], None]], None]] = None
+
+    def cursor(  # type: ignore[override]
+        self, factory: Callable[..., sqlite3.Cursor] = JournaledCursor
+    ) -> sqlite3.Cursor:
+        """Return a cursor that records writes."""
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        """Run a statement through a recording cursor."""
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Any], /
+    ) -> sqlite3.Cursor:
+        """Run a statement for each set of parameters through a cursor."""
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def record(self, sql: str, parameters: Any) -> None:
+        """Remember a write statement until the transaction ends."""
+        if self.recording and sql.lstrip().upper().startswith(
+            WRITE_STATEMENTS
+        ):
+            if isinstance(parameters, tuple):
+                parameters = list(parameters)
+            self.pending.append((sql, parameters))
+
+    def commit(self) -> None:
+        """Commit through the commit hook."""
+        if self.on_commit is None:
+            super().commit()
+        else:
+            self.on_commit(super().commit)
+
+    def rollback(self) -> None:
+        """Roll back and forget the writes of the transaction."""
+        super().rollback()
+        self.pending.clear()
+
+
+class InMemoryTaskOrganizer(TaskOrganizer):
+    """TaskOrganizer backed by a :memory: database.
+
+    The database file is loaded into memory at startup with the backup
+    API. Every committed write is first appended, with its bound values,
+    to an operation journal next to the database file. Once the number of
+    unsaved writes reaches the dirty threshold, or a timer finds unsaved
+    writes older than the snapshot interval, the journal is set aside and
+    a background thread copies the in-memory database to disk a few pages
+    at a time, so writes are never held up by a full copy. SQLite keeps
+    the copy consistent with writes made meanwhile. The journal set aside
+    is only deleted once the copy succeeds. At startup, journal entries
+    newer than the snapshot are replayed, so a crash loses no committed
+    write.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        snapshot_interval: float = 60.0,
+        dirty_threshold: int = 1000,
+        pages_per_step: int = 256,
+        step_sleep: float = 0.001,
+    ) -> None:
+        """Initialize InMemoryTaskOrganizer object."""
+        self.db_name = db_name
+        self.journal_path = db_name + "-oplog"
+        self.old_journal_path = self.journal_path + ".old"
+        self.snapshot_interval = snapshot_interval
+        self.dirty_threshold = dirty_threshold
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.seq = 0
+        self.dirty = 0
+        self.last_snapshot = time.monotonic()
+        self.lock = threading.Lock()
+        self.snapshot_thread: Optional[threading.Thread] = None
+        self.snapshot_error: Optional[sqlite3.Error] = None
+        self.journal: Optional[IO[str]] = None
+        super().__init__(db_name)
+        self.stopped = threading.Event()
+        self.timer = threading.Thread(target=self._run_timer, daemon=True)
+        self.timer.start()
+        atexit.register(self.close)
+
+    def _connect(self, db_name: str) -> sqlite3.Connection:
+        """Load the database file into memory and replay the journal."""
+        conn = sqlite3.connect(
+            ":memory:", factory=JournaledConnection, check_same_thread=False
+        )
+        disk = sqlite3.connect(db_name)
+        disk.backup(conn)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshot_state (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                last_seq INTEGER
+            )
+        """)
+        conn.execute(
+            "INSERT OR IGNORE INTO snapshot_state (id, last_seq) VALUES (0, 0)"
+        )
+        self.seq = conn.execute(
+            "SELECT last_seq FROM snapshot_state"
+        ).fetchone()[0]
+        replayed = False
+        for path in (self.old_journal_path, self.journal_path):
+            replayed |= self._replay(conn, path)
+        if replayed:
+            # Write the recovered state back right away so the journals,
+            # including any torn last line, can be removed.
+            conn.execute("UPDATE snapshot_state SET last_seq = ?", (self.seq,))
+            conn.commit()
+            conn.backup(disk)
+        conn.commit()
+        disk.close()
+        for path in (self.old_journal_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+        conn.on_commit = self._commit
+        conn.recording = True
+        self.journal = open(  # noqa: SIM115
+            self.journal_path, "a", encoding="utf-8"
+        )
+        return conn
+
+    def _replay(self, conn: sqlite3.Connection, path: str) -> bool:
+        """Apply journal entries newer than the snapshot from one file."""
+        if not os.path.exists(path):
+            return False
+        with open(path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    entry = None
+                if entry is None or not line.endswith("\n"):
+                    # A torn last line means the write never committed.
+                    break
+                if entry["seq"] <= self.seq:
+                    continue
+                conn.execute(entry["sql"], entry["params"])
+                self.seq = entry["seq"]
+        return True
+
+    def _commit(self, commit: Callable[[], None]) -> None:
+        """Append pending writes to the journal, then commit them."""
+        conn = self.conn
+        assert isinstance(conn, JournaledConnection)
+        with self.lock:
+            if conn.pending and self.journal is not None:
+                lines = []
+                for sql, params in conn.pending:
+                    self.seq += 1
+                    lines.append(
+                        json.dumps(
+                            {"seq": self.seq, "sql": sql, "params": params}
+                        )
+                    )
+                self.journal.write("\n".join(lines) + "\n")
+                self.journal.flush()
+                os.fsync(self.journal.fileno())
+                self.dirty += len(conn.pending)
+                conn.pending.clear()
+                conn.recording = False
+                try:
+                    conn.execute(
+                        "UPDATE snapshot_state SET last_seq = ?", (self.seq,)
+                    )
+                finally:
+                    conn.recording = True
+            commit()
+        self._maybe_snapshot()
+
+    def _run_timer(self) -> None:
+        """Check for unsaved writes once per snapshot interval."""
+        while not self.stopped.wait(self.snapshot_interval):
+            self._maybe_snapshot()
+
+    def _maybe_snapshot(self) -> None:
+        """Snapshot when the dirty threshold or the interval is reached."""
+        if self.dirty == 0:
+            return
+        elapsed = time.monotonic() - self.last_snapshot
+        if (
+            self.dirty >= self.dirty_threshold
+            or elapsed >= self.snapshot_interval
+        ):
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        """Start copying the in-memory database to disk in the background.
+
+        The current journal is set aside; it is deleted once the copy,
+        which includes every write it holds, is complete. If the last copy
+        failed, the journal is appended to the one still set aside.
+        """
+        with self.lock:
+            if self.journal is None or (
+                self.snapshot_thread is not None
+                and self.snapshot_thread.is_alive()
+            ):
+                return
+            self.journal.close()
+            if os.path.exists(self.old_journal_path):
+                with (
+                    open(self.journal_path, encoding="utf-8") as journal,
+                    open(self.old_journal_path, "a", encoding="utf-8") as old,
+                ):
+                    shutil.copyfileobj(journal, old)
+                    old.flush()
+                    os.fsync(old.fileno())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.old_journal_path)
+            self.journal = open(  # noqa: SIM115
+                self.journal_path, "a", encoding="utf-8"
+            )
+            self.snapshot_error = None
+            self.snapshot_thread = threading.Thread(
+                target=self._write_snapshot, args=(self.dirty,), daemon=True
+            )
+            self.dirty = 0
+            self.last_snapshot = time.monotonic()
+            self.snapshot_thread.start()
+
+    def _write_snapshot(self, dirty: int) -> None:
+        """Copy the in-memory database to disk page by page."""
+        try:
+            disk = sqlite3.connect(self.db_name)
+            try:
+                self.conn.backup(
+                    disk, pages=self.pages_per_step, sleep=self.step_sleep
+                )
+            finally:
+                disk.close()
+        except sqlite3.Error as error:
+            # Keep the journal set aside and count its writes as unsaved.
+            with self.lock:
+                self.snapshot_error = error
+                self.dirty += dirty
+            return
+        os.remove(self.old_journal_path)
+
+    def wait_for_snapshot(self) -> None:
+        """Wait until the background snapshot, if any, has finished.
+
+        Raises:
+            sqlite3.Error: If the snapshot could not be written.
+        """
+        if self.snapshot_thread is not None:
+            self.snapshot_thread.join()
+        error, self.snapshot_error = self.snapshot_error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Write a final snapshot if needed and close the database."""
+        if self.journal is None:
+            return
+        self.stopped.set()
+        self.timer.join()
+        if self.snapshot_thread is not None:
+            # A failed snapshot is retried below.
+            self.snapshot_thread.join()
+        if self.dirty:
+            self.snapshot()
+            self.wait_for_snapshot()
+        self.journal.close()
+        self.journal = None
+        os.remove(self.journal_path)
+        atexit.unregister(self.close)
+        super().close()
@@ -1,9 +1,23 @@
 """Tests for the application."""
 
+import atexit
+import glob
+import importlib.util
+import json
+import os
+import sqlite3
+import tempfile
+import threading
 import unittest
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, List, Tuple
 from unittest.mock import patch
 
-from definition import Project, Task, TaskOrganizer
+from definition import SCHEMA_VERSION, Project, Task, TaskOrganizer
+from federation import FederatedOrganizer
+from reminders import ReminderScheduler, webhook
+from snapshot import InMemoryTaskOrganizer, JournaledConnection
 
 
 class TestTaskOrganizer(unittest.TestCase):
@@ -167,6 +181,497 @@ class TestTaskOrganizer(unittest.TestCase):
             "DELETE FROM projects WHERE id = ?", (project_id,)
         )
 
+    def test_create_tables_skipped_when_current(self) -> None:
+        """Test skipping the schema setup for an up-to-date database."""
+        self.mock_cursor.fetchone.return_value = (SCHEMA_VERSION,)
+        self.mock_cursor.execute.reset_mock()
+        self.organizer.create_tables()
+        self.mock_cursor.execute.assert_called_once_with("PRAGMA user_version")
+
+
+class TestProjectSummaries(unittest.TestCase):
+    """Test the project dashboard summaries."""
+
+    def test_project_summaries(self) -> None:
+        """Test task counts for the first projects."""
+        organizer = TaskOrganizer(":memory:")
+        for project_id in ["p1", "p2", "p3"]:
+            organizer.add_project(Project(project_id, project_id))
+        organizer.add_task("p1", Task("1", "Task 1", "01/01/2024"))
+        organizer.add_task("p1", Task("2", "Task 2", "01/01/2024"))
+        organizer.mark_task_completed("p1", "2")
+        self.assertEqual(
+            organizer.project_summaries(limit=2),
+            [
+                ("p1", "p1", {"completed": 1, "pending": 1, "overdue": 0}),
+                ("p2", "p2", {"completed": 0, "pending": 0, "overdue": 0}),
+            ],
+        )
+        self.assertEqual(len(organizer.project_summaries()), 3)
+        self.assertEqual(organizer.list_projects(limit=1), [("p1", "p1")])
+
+
+class TestTaskDependencies(unittest.TestCase):
+    """Test task dependencies."""
+
+    def setUp(self) -> None:
+        """Set up an in-memory database with tasks in two projects."""
+        self.organizer = TaskOrganizer(":memory:")
+        self.organizer.add_project(Project("p1", "Project 1"))
+        self.organizer.add_project(Project("p2", "Project 2"))
+        for task_id, project_id in [
+            ("a", "p1"),
+            ("b", "p1"),
+            ("c", "p2"),
+            ("d", "p2"),
+        ]:
+            self.organizer.add_task(
+                project_id, Task(task_id, task_id, "01/01/2024")
+            )
+        self.organizer.add_dependency("b", "a")
+        self.organizer.add_dependency("c", "b")
+        self.organizer.add_dependency("d", "a")
+
+    def ready_ids(self) -> List[str]:
+        """Return the IDs of ready tasks."""
+        return sorted(row[0] for row in self.organizer.list_ready_tasks())
+
+    def test_add_dependency_rejects_cycle(self) -> None:
+        """Test refusing dependencies that create a cycle."""
+        self.assertFalse(self.organizer.add_dependency("a", "c"))
+        self.assertFalse(self.organizer.add_dependency("a", "a"))
+        self.assertFalse(self.organizer.add_dependency("a", "missing"))
+        self.assertTrue(self.organizer.add_dependency("d", "c"))
+
+    def test_mark_task_completed_unblocks(self) -> None:
+        """Test dependents become ready when a task is completed."""
+        self.assertEqual(self.ready_ids(), ["a"])
+        self.assertTrue(self.organizer.is_blocked("b"))
+        self.organizer.mark_task_completed("p1", "a")
+        self.assertEqual(self.ready_ids(), ["b", "d"])
+        self.assertEqual(
+            [row[0] for row in self.organizer.list_blocked_tasks()], ["c"]
+        )
+
+    def test_delete_task_unblocks(self) -> None:
+        """Test dependents become ready when a task is deleted."""
+        self.organizer.delete_task("p1", "b")
+        self.assertFalse(self.organizer.is_blocked("c"))
+
+    def test_remove_dependency(self) -> None:
+        """Test removing a dependency."""
+        self.organizer.remove_dependency("d", "a")
+        self.assertEqual(self.ready_ids(), ["a", "d"])
+
+    def test_topological_order(self) -> None:
+        """Test tasks come after their dependencies."""
+        order = self.organizer.topological_order()
+        self.assertEqual(sorted(order), ["a", "b", "c", "d"])
+        self.assertLess(order.index("a"), order.index("b"))
+        self.assertLess(order.index("b"), order.index("c"))
+        self.assertLess(order.index("a"), order.index("d"))
+
+    def test_critical_path(self) -> None:
+        """Test the longest chain of unfinished tasks."""
+        self.assertEqual(self.organizer.critical_path(), ["a", "b", "c"])
+        self.organizer.mark_task_completed("p1", "a")
+        self.assertEqual(self.organizer.critical_path(), ["b", "c"])
+
+
+class TestInMemoryTaskOrganizer(unittest.TestCase):
+    """Test the in-memory organizer."""
+
+    def setUp(self) -> None:
+        """Create a temporary database file."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, "test.db")
+
+    def tearDown(self) -> None:
+        """Remove the temporary database file."""
+        self.tmpdir.cleanup()
+
+    def count_disk_projects(self) -> int:
+        """Count projects stored in the database file."""
+        conn = sqlite3.connect(self.db_name)
+        count = conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+        conn.close()
+        return int(count)
+
+    def test_snapshot_on_close(self) -> None:
+        """Test writing the snapshot at shutdown."""
+        organizer = InMemoryTaskOrganizer(self.db_name)
+        organizer.add_project(Project("1", "Test Project"))
+        organizer.close()
+        self.assertEqual(self.count_disk_projects(), 1)
+        self.assertFalse(os.path.exists(self.db_name + "-oplog"))
+
+    def test_snapshot_on_dirty_threshold(self) -> None:
+        """Test writing the snapshot once enough writes are dirty."""
+        organizer = InMemoryTaskOrganizer(self.db_name, dirty_threshold=2)
+        organizer.add_project(Project("1", "Test Project"))
+        organizer.wait_for_snapshot()
+        self.assertEqual(self.count_disk_projects(), 1)
+        self.assertFalse(os.path.exists(self.db_name + "-oplog.old"))
+        organizer.close()
+
+    def crash(self, organizer: InMemoryTaskOrganizer) -> None:
+        """Drop an organizer without its final snapshot."""
+        atexit.unregister(organizer.close)
+        organizer.stopped.set()
+        organizer.timer.join()
+        organizer.wait_for_snapshot()
+        assert organizer.journal is not None
+        organizer.journal.close()
+        organizer.conn.close()
+
+    def test_failed_snapshot_keeps_journal(self) -> None:
+        """Test writes survive a crash after snapshots failed."""
+        organizer = InMemoryTaskOrganizer(self.db_name, dirty_threshold=1)
+        with patch.object(
+            JournaledConnection,
+            "backup",
+            side_effect=sqlite3.OperationalError("disk I/O error"),
+        ):
+            for project_id in ["1", "2", "3"]:
+                organizer.add_project(Project(project_id, "Test Project"))
+                with self.assertRaises(sqlite3.OperationalError):
+                    organizer.wait_for_snapshot()
+        self.crash(organizer)
+
+        recovered = InMemoryTaskOrganizer(self.db_name)
+        self.assertEqual(len(recovered.list_projects()), 3)
+        recovered.close()
+
+    def test_snapshot_on_timer(self) -> None:
+        """Test unsaved writes reach the disk without further writes."""
+        organizer = InMemoryTaskOrganizer(self.db_name, snapshot_interval=0.05)
+        organizer.add_project(Project("1", "Test Project"))
+        for _ in range(100):
+            if organizer.snapshot_thread is not None:
+                break
+            threading.Event().wait(0.05)
+        organizer.wait_for_snapshot()
+        disk = sqlite3.connect(self.db_name)
+        self.assertEqual(
+            disk.execute("SELECT * FROM projects").fetchall(),
+            [("1", "Test Project")],
+        )
+        disk.close()
+        organizer.close()
+
+    def test_replay_journal_after_crash(self) -> None:
+        """Test recovering writes that were never snapshotted."""
+        organizer = InMemoryTaskOrganizer(self.db_name)
+        organizer.add_project(Project("1", "Test Project"))
+        organizer.add_task("1", Task("1", "It's a task", "01/01/2024"))
+        history = organizer.fetch_history()
+        self.crash(organizer)
+
+        recovered = InMemoryTaskOrganizer(self.db_name)
+        self.assertEqual(recovered.list_projects(), [("1", "Test Project")])
+        self.assertEqual(recovered.search_tasks("task")[0][1], "It's a task")
+        self.assertEqual(recovered.fetch_history(), history)
+        recovered.close()
+
+    def test_replay_after_torn_write(self) -> None:
+        """Test writes after a torn journal line survive the next crash."""
+        organizer = InMemoryTaskOrganizer(self.db_name)
+        organizer.add_project(Project("1", "Test Project"))
+        self.crash(organizer)
+        with open(self.db_name + "-oplog", "a", encoding="utf-8") as journal:
+            journal.write('{"seq": 99, "sql": "INSERT')
+
+        recovered = InMemoryTaskOrganizer(self.db_name)
+        recovered.add_project(Project("2", "Second Project"))
+        self.crash(recovered)
+
+        again = InMemoryTaskOrganizer(self.db_name)
+        self.assertEqual(len(again.list_projects()), 2)
+        again.close()
+
+    def test_rolled_back_write_is_not_replayed(self) -> None:
+        """Test rolled back writes stay out of the journal."""
+        organizer = InMemoryTaskOrganizer(self.db_name)
+        organizer.conn.execute(
+            "INSERT INTO projects (id, name) VALUES ('x', 'Rolled back')"
+        )
+        organizer.conn.rollback()
+        organizer.add_project(Project("1", "Test Project"))
+        self.crash(organizer)
+
+        recovered = InMemoryTaskOrganizer(self.db_name)
+        self.assertEqual(recovered.list_projects(), [("1", "Test Project")])
+        recovered.close()
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "requires NumPy")
+class TestAnalytics(unittest.TestCase):
+    """Test the analytics report."""
+
+    def setUp(self) -> None:
+        """Set up an in-memory database with tasks and history."""
+        self.organizer = TaskOrganizer(":memory:")
+        self.organizer.add_project(Project("p1", "Project 1"))
+        self.organizer.add_project(Project("p2", "Project 2"))
+        self.organizer.add_task(
+            "p1", Task("t1", "Task 1", "01/05/2024", recurrence="daily")
+        )
+        self.organizer.add_task(
+            "p1", Task("t2", "Task 2", "01/03/2024", recurrence="daily")
+        )
+        self.organizer.add_task("p2", Task("t3", "Task 3", "1/20/2024"))
+        self.organizer.mark_task_completed("p1", "t1")
+        self.organizer.conn.executemany(
+            "UPDATE history SET timestamp = ? WHERE entity_id = ? "
+            "AND action = ?",
+            [
+                ("2024-01-01 08:00:00", "t1", "Add"),
+                ("2024-01-01 09:00:00", "t2", "Add"),
+                ("2024-01-02 10:00:00", "t3", "Add"),
+                ("2024-01-03 08:00:00", "t1", "Complete"),
+            ],
+        )
+        self.analytics = self.load()
+
+    def load(self) -> Any:
+        """Load the analytics, importing NumPy only when it is installed."""
+        from analytics import Analytics
+
+        return Analytics(
+            self.organizer.conn, chunk_size=2, today=date(2024, 1, 31)
+        )
+
+    def test_parse_due_dates(self) -> None:
+        """Test parsing padded, unpadded and invalid due dates."""
+        from analytics import parse_due_dates
+
+        days = parse_due_dates(
+            ["01/02/1970", "1/3/1970", "02/30/2024", "bad", None]
+        )
+        self.assertEqual(days.tolist(), [1, 2, -1, -1, -1])
+
+    def test_due_days(self) -> None:
+        """Test decoding padded, unpadded and invalid due dates."""
+        self.organizer.conn.execute(
+            "INSERT INTO tasks VALUES ('t4', 'Task 4', 'bad', 'pending', "
+            "'p2', 'medium', 'none')"
+        )
+        analytics = self.load()
+        due = dict(
+            zip(
+                analytics.task_ids.tolist(),
+                analytics.due_days.tolist(),
+                strict=True,
+            )
+        )
+        self.assertEqual(
+            due, {"t1": 19727, "t2": 19725, "t3": 19742, "t4": -1}
+        )
+
+    def test_completion_rate(self) -> None:
+        """Test the daily completion rate series."""
+        series = self.analytics.completion_rate()
+        self.assertEqual(series["added"].tolist(), [2, 1, 0])
+        self.assertEqual(series["completed"].tolist(), [0, 0, 1])
+        self.assertAlmostEqual(series["rate"][-1], 1 / 3)
+
+    def test_burndown(self) -> None:
+        """Test open tasks per day per project."""
+        burndown = self.analytics.burndown()
+        self.assertEqual(burndown["p1"][1].tolist(), [2, 2, 1])
+        self.assertEqual(burndown["p2"][1].tolist(), [0, 1, 1])
+
+    def test_average_lead_time(self) -> None:
+        """Test the lead time from Add to Complete."""
+        self.assertAlmostEqual(self.analytics.average_lead_time() or 0, 2.0)
+
+    def test_average_lead_time_deleted_task(self) -> None:
+        """Test that deleted tasks still count towards the lead time."""
+        self.organizer.delete_task("p1", "t1")
+        analytics = self.load()
+        self.assertAlmostEqual(analytics.average_lead_time() or 0, 2.0)
+
+    def test_overdue_aging(self) -> None:
+        """Test overdue buckets."""
+        self.assertEqual(
+            self.analytics.overdue_aging(),
+            {"1-7": 0, "8-30": 2, "31-90": 0, "91+": 0},
+        )
+
+    def test_recurrence_adherence(self) -> None:
+        """Test the share of recurring tasks completed on time."""
+        self.assertEqual(self.analytics.recurrence_adherence(), {"daily": 0.5})
+
+
+class TestFederatedOrganizer(unittest.TestCase):
+    """Test queries across several databases."""
+
+    def setUp(self) -> None:
+        """Create two team databases in a directory that needs escaping."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.shard_dir = os.path.join(self.tmpdir.name, "team#1?%")
+        os.mkdir(self.shard_dir)
+        for team, task_ids in [("a", ["1", "3"]), ("b", ["2"])]:
+            organizer = TaskOrganizer(
+                os.path.join(self.shard_dir, f"{team}.db")
+            )
+            organizer.add_project(Project(team, f"Team {team}"))
+            for task_id in task_ids:
+                organizer.add_task(
+                    team, Task(task_id, f"Task {task_id}", "01/01/2024")
+                )
+            organizer.mark_task_completed(team, task_ids[0])
+            organizer.close()
+        self.pattern = os.path.join(glob.escape(self.shard_dir), "*.db")
+        self.federated = FederatedOrganizer(self.pattern)
+
+    def tearDown(self) -> None:
+        """Shut down the pool and remove the databases."""
+        self.federated.close()
+        self.tmpdir.cleanup()
+
+    def test_search_tasks(self) -> None:
+        """Test merging and limiting search results."""
+        tasks = self.federated.search_tasks("Task", limit=2)
+        self.assertEqual([row[1] for row in tasks], ["1", "2"])
+        self.assertEqual(os.path.basename(tasks[1][0]), "b.db")
+        self.assertEqual(len(self.federated.timings), 2)
+
+    def test_project_summaries(self) -> None:
+        """Test task counts across databases."""
+        summaries = self.federated.project_summaries()
+        self.assertEqual(
+            [(project_id, counts) for _, project_id, _, counts in summaries],
+            [
+                ("a", {"completed": 1, "pending": 1, "overdue": 0}),
+                ("b", {"completed": 1, "pending": 0, "overdue": 0}),
+            ],
+        )
+        self.assertEqual(len(self.federated.project_summaries(limit=1)), 1)
+
+    def test_process_pool(self) -> None:
+        """Test running the queries in worker processes."""
+        federated = FederatedOrganizer(self.pattern, use_processes=True)
+        self.assertEqual(
+            [row[1] for row in federated.list_projects()], ["a", "b"]
+        )
+        self.assertEqual(len(federated.fetch_history(limit=3)), 3)
+        federated.close()
+
+
+class TestReminderScheduler(unittest.TestCase):
+    """Test due-soon and overdue reminders."""
+
+    def setUp(self) -> None:
+        """Set up tasks due over the coming weeks."""
+        self.organizer = TaskOrganizer(":memory:")
+        self.organizer.add_project(Project("p1", "Project 1"))
+        self.organizer.add_task("p1", Task("1", "Soon", "01/02/2024"))
+        self.organizer.add_task("p1", Task("2", "Later", "1/20/2024"))
+        self.organizer.add_task("p1", Task("3", "Past", "12/01/2023"))
+        self.sent: List[Tuple[str, str]] = []
+        self.scheduler = self.start(datetime(2024, 1, 1, 9))
+
+    def start(self, now: datetime) -> ReminderScheduler:
+        """Start a scheduler that records the reminders it sends."""
+        return ReminderScheduler(
+            self.organizer,
+            lambda event, task: self.sent.append((event, task[0])),
+            now=now,
+            catch_up=timedelta(days=60),
+        )
+
+    def test_due_soon_and_overdue(self) -> None:
+        """Test reminders fire as their time comes."""
+        self.assertEqual(
+            self.scheduler.run_pending(datetime(2024, 1, 1, 9)), 2
+        )
+        self.assertEqual(self.scheduler.run_pending(datetime(2024, 1, 3)), 1)
+        self.assertEqual(
+            self.sent,
+            [("overdue", "3"), ("due_soon", "1"), ("overdue", "1")],
+        )
+
+    def test_task_overdue_before_start(self) -> None:
+        """Test tasks already past due get only their overdue reminder."""
+        self.scheduler.run_pending(datetime(2024, 1, 1, 9))
+        self.assertEqual(self.sent.count(("overdue", "3")), 1)
+        self.assertNotIn(("due_soon", "3"), self.sent)
+
+    def test_restart_does_not_resend(self) -> None:
+        """Test a new scheduler skips reminders that were already sent."""
+        self.scheduler.run_pending(datetime(2024, 1, 1, 9))
+        self.organizer.listeners.clear()
+        scheduler = self.start(datetime(2024, 1, 3))
+        scheduler.run_pending(datetime(2024, 1, 3))
+        self.assertEqual(
+            self.sent,
+            [("overdue", "3"), ("due_soon", "1"), ("overdue", "1")],
+        )
+
+    def test_catch_up_is_bounded(self) -> None:
+        """Test reminders older than the catch-up window are not sent."""
+        self.organizer.listeners.clear()
+        scheduler = ReminderScheduler(
+            self.organizer,
+            lambda event, task: self.sent.append((event, task[0])),
+            now=datetime(2024, 1, 1, 9),
+        )
+        scheduler.run_pending(datetime(2024, 1, 1, 9))
+        self.assertEqual(self.sent, [("due_soon", "1")])
+
+    def test_invalid_due_date_is_skipped(self) -> None:
+        """Test tasks with impossible due dates do not stop the scheduler."""
+        self.organizer.add_task("p1", Task("4", "Bad", "02/30/2024"))
+        self.organizer.listeners.clear()
+        scheduler = self.start(datetime(2024, 1, 1, 9))
+        self.assertEqual(scheduler.run_pending(datetime(2024, 1, 1, 9)), 2)
+
+    def test_window_moves_forward(self) -> None:
+        """Test tasks beyond the first window are loaded later."""
+        self.assertNotIn("2", self.scheduler.versions)
+        self.scheduler.run_pending(datetime(2024, 1, 19))
+        self.assertIn(("due_soon", "2"), self.sent)
+
+    def test_completed_task_is_cancelled(self) -> None:
+        """Test completing a task cancels its reminders."""
+        self.organizer.mark_task_completed("p1", "1")
+        self.organizer.mark_task_completed("p1", "3")
+        self.scheduler.run_pending(datetime(2024, 1, 3))
+        self.assertEqual(self.sent, [])
+        self.assertIsNone(self.scheduler.next_fire_time())
+
+    def test_edited_task_is_rescheduled(self) -> None:
+        """Test editing the due date moves the reminders."""
+        self.organizer.edit_task("p1", "1", due_date="01/05/2024")
+        self.organizer.add_task("p1", Task("4", "New", "01/03/2024"))
+        self.scheduler.run_pending(datetime(2024, 1, 3))
+        self.assertEqual(self.sent, [("overdue", "3"), ("due_soon", "4")])
+
+    def test_webhook(self) -> None:
+        """Test posting a reminder to a local server."""
+        received: List[Any] = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers["Content-Length"])
+                received.append(json.loads(self.rfile.read(length)))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        notify = webhook(f"http://127.0.0.1:{server.server_port}/")
+        notify("overdue", ("1", "Soon", "01/02/2024", "pending", "p1", "", ""))
+        thread.join()
+        server.server_close()
+        self.assertEqual(received[0]["event"], "overdue")
+        self.assertEqual(received[0]["task"]["task_id"], "1")
+
 
 if __name__ == "__main__":
     unittest.main()